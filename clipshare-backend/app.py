@@ -1,22 +1,24 @@
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import uuid
 from datetime import datetime
 import json
 
-try:
-    from azure.cosmos import CosmosClient, exceptions
-    from azure.storage.blob import BlobServiceClient, ContentSettings
-    AZURE_AVAILABLE = True
-except ImportError:
-    AZURE_AVAILABLE = False
+from services.azure_clients import (
+    module_available, azure_configured, azure_ready, get_container, get_blob_service_client, check_health
+)
+from services.ranking import FeedIndex, stamp_trend_score, record_trend_event, VIEW_WEIGHT, LIKE_WEIGHT
+from services.rate_limiter import RateLimiter, RateLimitExceeded, AdmissionRejected, DEFAULT_STATE_DIR
+
+AZURE_AVAILABLE = module_available('azure.cosmos') and module_available('azure.storage.blob')
+COGNITIVE_SERVICES_AVAILABLE = (
+    module_available('azure.cognitiveservices.vision.computervision') and module_available('requests')
+)
 
-try:
+if COGNITIVE_SERVICES_AVAILABLE:
     from services.cognitive_services import get_video_insights, analyze_video_thumbnail, transcribe_video
-    COGNITIVE_SERVICES_AVAILABLE = True
-except ImportError:
-    COGNITIVE_SERVICES_AVAILABLE = False
 
 app = Flask(__name__)
 
@@ -30,28 +32,26 @@ CORS(
     expose_headers=["Content-Range", "X-Content-Range"],
 )
 
+# Number of reverse proxies in front of the app. Only the X-Forwarded-For
+# entries they append are trusted for client addresses; leave at 0 when the
+# app is exposed directly (deploy.sh sets 1 for App Service).
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=0)
+
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024
 app.config['UPLOAD_FOLDER'] = 'uploads'
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'videos'), exist_ok=True)
 
-USE_AZURE = False
-if AZURE_AVAILABLE:
-    COSMOS_ENDPOINT = os.environ.get('COSMOS_ENDPOINT')
-    COSMOS_KEY = os.environ.get('COSMOS_KEY')
-    STORAGE_CONNECTION_STRING = os.environ.get('STORAGE_CONNECTION_STRING')
-    
-    if COSMOS_ENDPOINT and COSMOS_KEY and STORAGE_CONNECTION_STRING:
-        try:
-            cosmos_client = CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY)
-            database = cosmos_client.get_database_client("clipsharedb")
-            container = database.get_container_client("videos")
-            blob_service_client = BlobServiceClient.from_connection_string(STORAGE_CONNECTION_STRING)
-            USE_AZURE = True
-        except Exception as e:
-            print(f"Azure connection failed: {e}")
-            USE_AZURE = False
+# Clients are created lazily on first use in each worker process, so
+# importing the app (or preloading it in the gunicorn master) stays cheap.
+USE_AZURE = AZURE_AVAILABLE and azure_configured()
+
+def use_azure():
+    # Falls back to local storage while Azure can't be reached.
+    return USE_AZURE and azure_ready()
 
 LOCAL_DB_FILE = 'local_videos.json'
 
@@ -65,6 +65,68 @@ def save_local_db(videos):
     with open(LOCAL_DB_FILE, 'w') as f:
         json.dump(videos, f, indent=2)
 
+def load_all_videos():
+    if use_azure():
+        return list(get_container().query_items(
+            query="SELECT * FROM c",
+            enable_cross_partition_query=True
+        ))
+    return load_local_db()
+
+def load_video(video_id):
+    if use_azure():
+        items = list(get_container().query_items(
+            query="SELECT * FROM c WHERE c.id = @id",
+            parameters=[{'name': '@id', 'value': video_id}],
+            enable_cross_partition_query=True
+        ))
+        return items[0] if items else None
+    return next((v for v in load_local_db() if v['id'] == video_id), None)
+
+# Decayed trending scores are stored on each video document and bumped by the
+# view/like handlers. Each worker keeps an index of them (plus related-video
+# lists) that a background thread refreshes from storage.
+feed_index = FeedIndex()
+MAX_FEED_LIMIT = 100
+
+def feed_limit(default):
+    # Raises ValueError for non-integers; callers turn that into a 400.
+    return max(1, min(int(request.args.get('limit', default)), MAX_FEED_LIMIT))
+
+# Expensive endpoints are throttled per client and capped globally. State is
+# kept on local disk so every gunicorn worker on the host shares it.
+rate_limiter = RateLimiter(
+    os.environ.get('RATE_LIMIT_DIR', DEFAULT_STATE_DIR),
+    enabled=os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+)
+# (requests allowed, per seconds) for each client on each route
+RATE_LIMITS = {
+    'upload': (5, 300),
+    'analyze': (5, 300),
+    'transcript': (5, 300)
+}
+COGNITIVE_POOL = {
+    'pool': 'cognitive',
+    'max_concurrent': int(os.environ.get('COGNITIVE_MAX_CONCURRENT', 2)),
+    'max_queue': int(os.environ.get('COGNITIVE_MAX_QUEUE', 2)),
+    'max_wait': float(os.environ.get('COGNITIVE_MAX_WAIT', 10))
+}
+UPLOAD_POOL = {
+    'pool': 'upload',
+    'max_concurrent': int(os.environ.get('UPLOAD_MAX_CONCURRENT', 2)),
+    'max_queue': int(os.environ.get('UPLOAD_MAX_QUEUE', 2)),
+    'max_wait': float(os.environ.get('UPLOAD_MAX_WAIT', 10))
+}
+
+def client_id():
+    # Behind ProxyFix this is the address added by the trusted proxy, not a
+    # client-supplied X-Forwarded-For entry.
+    return request.remote_addr or 'unknown'
+
+def route_limit(route):
+    capacity, per_seconds = RATE_LIMITS[route]
+    return rate_limiter.limit(route, client_id, capacity, per_seconds)
+
 @app.route('/')
 def index():
     return jsonify({
@@ -74,9 +136,10 @@ def index():
             'health': '/api/health',
             'videos': '/api/videos',
             'upload': '/api/videos/upload',
-            'search': '/api/search'
+            'search': '/api/search',
+            'trending': '/api/feed/trending'
         },
-        'mode': 'Azure' if USE_AZURE else 'Local',
+        'mode': 'Azure' if use_azure() else 'Local',
         'status': 'running'
     })
 
@@ -85,8 +148,8 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
-        'mode': 'Azure' if USE_AZURE else 'Local Storage',
-        'azure_connected': USE_AZURE
+        'mode': 'Azure' if use_azure() else 'Local Storage',
+        'azure_connected': use_azure() and check_health()
     })
 
 @app.route('/api/videos', methods=['GET'])
@@ -95,9 +158,9 @@ def get_videos():
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('page_size', 10))
         
-        if USE_AZURE:
+        if use_azure():
             query = "SELECT * FROM c ORDER BY c.createdAt DESC"
-            items = list(container.query_items(
+            items = list(get_container().query_items(
                 query=query,
                 enable_cross_partition_query=True
             ))
@@ -123,9 +186,9 @@ def get_videos():
 @app.route('/api/videos/<video_id>', methods=['GET'])
 def get_video(video_id):
     try:
-        if USE_AZURE:
+        if use_azure():
             query = f"SELECT * FROM c WHERE c.id = '{video_id}'"
-            items = list(container.query_items(
+            items = list(get_container().query_items(
                 query=query,
                 enable_cross_partition_query=True
             ))
@@ -147,6 +210,8 @@ def get_video(video_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/videos/upload', methods=['POST'])
+@route_limit('upload')
+@rate_limiter.concurrency(**UPLOAD_POOL)
 def upload_video():
     try:
         if 'video' not in request.files:
@@ -163,10 +228,13 @@ def upload_video():
         
         video_id = str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat()
+        azure = use_azure()
         
-        if USE_AZURE:
+        if azure:
             blob_name = f"{video_id}/{video_file.filename}"
-            container_client = blob_service_client.get_container_client("videos")
+            from azure.storage.blob import ContentSettings
+
+            container_client = get_blob_service_client().get_container_client("videos")
             
             try:
                 container_client.create_container()
@@ -194,8 +262,9 @@ def upload_video():
                 'likes': 0,
                 'status': 'ready'
             }
+            stamp_trend_score(video_metadata)
             
-            container.create_item(body=video_metadata)
+            get_container().create_item(body=video_metadata)
             
         else:
             filename = f"{video_id}_{video_file.filename}"
@@ -216,15 +285,19 @@ def upload_video():
                 'likes': 0,
                 'status': 'ready'
             }
+            stamp_trend_score(video_metadata)
             
             videos = load_local_db()
             videos.append(video_metadata)
             save_local_db(videos)
         
         insights = None
-        if COGNITIVE_SERVICES_AVAILABLE and USE_AZURE:
+        if COGNITIVE_SERVICES_AVAILABLE and azure:
             try:
-                insights = get_video_insights(video_url, video_id, video_metadata)
+                # This worker already holds an upload slot, so don't queue for
+                # a cognitive slot too; skip insights if none is free now.
+                with rate_limiter.admit(**dict(COGNITIVE_POOL, max_queue=0)):
+                    insights = get_video_insights(video_url, video_id, video_metadata)
                 video_metadata.update({
                     'tags': insights.get('analysis', {}).get('tags', []),
                     'description_ai': insights.get('analysis', {}).get('description'),
@@ -236,9 +309,13 @@ def upload_video():
                         v.update(video_metadata)
                         break
                 save_local_db(videos)
+            except AdmissionRejected:
+                print(f"Cognitive Services busy, skipping insights for {video_id}")
             except Exception as e:
                 print(f"Cognitive Services error: {e}")
         
+        feed_index.update(video_metadata)
+        
         response_data = {
             'message': 'Video uploaded successfully',
             'videoId': video_id,
@@ -268,9 +345,9 @@ def serve_video(filename):
 @app.route('/api/videos/<video_id>/view', methods=['POST'])
 def increment_view(video_id):
     try:
-        if USE_AZURE:
+        if use_azure():
             query = f"SELECT * FROM c WHERE c.id = '{video_id}'"
-            items = list(container.query_items(
+            items = list(get_container().query_items(
                 query=query,
                 enable_cross_partition_query=True
             ))
@@ -280,7 +357,8 @@ def increment_view(video_id):
             
             video = items[0]
             video['views'] = video.get('views', 0) + 1
-            container.upsert_item(body=video)
+            record_trend_event(video, VIEW_WEIGHT)
+            get_container().upsert_item(body=video)
             
         else:
             videos = load_local_db()
@@ -290,8 +368,10 @@ def increment_view(video_id):
                 return jsonify({'error': 'Video not found'}), 404
             
             video['views'] = video.get('views', 0) + 1
+            record_trend_event(video, VIEW_WEIGHT)
             save_local_db(videos)
         
+        feed_index.update(video)
         return jsonify({'views': video['views']})
         
     except Exception as e:
@@ -300,9 +380,9 @@ def increment_view(video_id):
 @app.route('/api/videos/<video_id>/like', methods=['POST'])
 def like_video(video_id):
     try:
-        if USE_AZURE:
+        if use_azure():
             query = f"SELECT * FROM c WHERE c.id = '{video_id}'"
-            items = list(container.query_items(
+            items = list(get_container().query_items(
                 query=query,
                 enable_cross_partition_query=True
             ))
@@ -312,7 +392,8 @@ def like_video(video_id):
             
             video = items[0]
             video['likes'] = video.get('likes', 0) + 1
-            container.upsert_item(body=video)
+            record_trend_event(video, LIKE_WEIGHT)
+            get_container().upsert_item(body=video)
             
         else:
             videos = load_local_db()
@@ -322,8 +403,10 @@ def like_video(video_id):
                 return jsonify({'error': 'Video not found'}), 404
             
             video['likes'] = video.get('likes', 0) + 1
+            record_trend_event(video, LIKE_WEIGHT)
             save_local_db(videos)
         
+        feed_index.update(video)
         return jsonify({'likes': video['likes']})
         
     except Exception as e:
@@ -337,7 +420,7 @@ def search_videos():
         if not search_term:
             return jsonify({'error': 'Search term required'}), 400
         
-        if USE_AZURE:
+        if use_azure():
             query = f"""
             SELECT * FROM c 
             WHERE CONTAINS(LOWER(c.title), '{search_term}')
@@ -345,7 +428,7 @@ def search_videos():
             ORDER BY c.createdAt DESC
             """
             
-            items = list(container.query_items(
+            items = list(get_container().query_items(
                 query=query,
                 enable_cross_partition_query=True
             ))
@@ -366,15 +449,64 @@ def search_videos():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/feed/trending', methods=['GET'])
+def get_trending():
+    try:
+        try:
+            limit = feed_limit(20)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        feed_index.start(load_all_videos)
+        videos = feed_index.trending(limit)
+        
+        return jsonify({
+            'videos': videos,
+            'count': len(videos)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/videos/<video_id>/related', methods=['GET'])
+def get_related(video_id):
+    try:
+        try:
+            limit = feed_limit(10)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        feed_index.start(load_all_videos)
+        related = feed_index.related(video_id, limit)
+        
+        if related is None:
+            # May have been uploaded through another worker since the last sync.
+            video = load_video(video_id)
+            if not video:
+                return jsonify({'error': 'Video not found'}), 404
+            feed_index.update(video)
+            related = feed_index.related(video_id, limit)
+        
+        return jsonify({
+            'video_id': video_id,
+            'related': related,
+            'count': len(related)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/videos/<video_id>/analyze', methods=['POST'])
+@route_limit('analyze')
+@rate_limiter.concurrency(**COGNITIVE_POOL)
 def analyze_video(video_id):
     try:
         if not COGNITIVE_SERVICES_AVAILABLE:
             return jsonify({'error': 'Cognitive Services not available'}), 503
         
-        if USE_AZURE:
+        if use_azure():
             query = f"SELECT * FROM c WHERE c.id = '{video_id}'"
-            items = list(container.query_items(
+            items = list(get_container().query_items(
                 query=query,
                 enable_cross_partition_query=True
             ))
@@ -394,14 +526,16 @@ def analyze_video(video_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/videos/<video_id>/transcript', methods=['GET'])
+@route_limit('transcript')
+@rate_limiter.concurrency(**COGNITIVE_POOL)
 def get_transcript(video_id):
     try:
         if not COGNITIVE_SERVICES_AVAILABLE:
             return jsonify({'error': 'Cognitive Services not available'}), 503
         
-        if USE_AZURE:
+        if use_azure():
             query = f"SELECT * FROM c WHERE c.id = '{video_id}'"
-            items = list(container.query_items(
+            items = list(get_container().query_items(
                 query=query,
                 enable_cross_partition_query=True
             ))
@@ -427,14 +561,7 @@ def get_transcript(video_id):
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     try:
-        if USE_AZURE:
-            query = "SELECT * FROM c"
-            videos = list(container.query_items(
-                query=query,
-                enable_cross_partition_query=True
-            ))
-        else:
-            videos = load_local_db()
+        videos = load_all_videos()
         
         total_views = sum(v.get('views', 0) for v in videos)
         total_likes = sum(v.get('likes', 0) for v in videos)
@@ -443,7 +570,7 @@ def get_stats():
             'total_videos': len(videos),
             'total_views': total_views,
             'total_likes': total_likes,
-            'storage_mode': 'Azure' if USE_AZURE else 'Local',
+            'storage_mode': 'Azure' if use_azure() else 'Local',
             'cognitive_services_enabled': COGNITIVE_SERVICES_AVAILABLE
         }
         
@@ -460,6 +587,20 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+@app.errorhandler(RateLimitExceeded)
+def rate_limited(error):
+    return jsonify({
+        'error': 'Too many requests',
+        'retry_after': error.retry_after
+    }), 429, {'Retry-After': str(error.retry_after)}
+
+@app.errorhandler(AdmissionRejected)
+def server_busy(error):
+    return jsonify({
+        'error': 'Server busy, please retry',
+        'retry_after': error.retry_after
+    }), 503, {'Retry-After': str(error.retry_after)}
+
 @app.errorhandler(413)
 def too_large(error):
     return jsonify({'error': 'File too large. Maximum size is 500MB'}), 413
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import subprocess
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import time
+import app
+client = app.app.test_client()
+start = time.perf_counter()
+client.get('/api/videos')
+print(time.perf_counter() - start)
+"""
+
+def run_snippet(snippet: str) -> float:
+    output = subprocess.check_output([sys.executable, '-c', snippet], cwd=BACKEND_DIR)
+    return float(output.decode().strip().splitlines()[-1])
+
+def summarize(label: str, samples):
+    print(f"{label}: median {statistics.median(samples) * 1000:.1f} ms, "
+          f"min {min(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms")
+
+def main(runs: int = 10):
+    import_times = [run_snippet(IMPORT_SNIPPET) for _ in range(runs)]
+    first_request_times = [run_snippet(FIRST_REQUEST_SNIPPET) for _ in range(runs)]
+    summarize('import app', import_times)
+    summarize('first request', first_request_times)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
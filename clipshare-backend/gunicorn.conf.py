@@ -0,0 +1,16 @@
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 80)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+# Threads let cheap reads keep flowing while uploads and cognitive calls,
+# which are capped by services/rate_limiter.py, wait on network I/O.
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Import the app once in the master and fork it into workers. Azure clients
+# are created lazily per process, so nothing network-bound is shared.
+preload_app = True
+
+def post_fork(server, worker):
+    from services.azure_clients import reset_clients
+    reset_clients()
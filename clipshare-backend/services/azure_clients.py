@@ -0,0 +1,129 @@
+import os
+import time
+import threading
+import importlib.util
+from typing import Dict, Optional
+
+COSMOS_DATABASE = 'clipsharedb'
+COSMOS_CONTAINER = 'videos'
+HEALTH_CHECK_TTL = float(os.environ.get('AZURE_HEALTH_CHECK_TTL', 30))
+RETRY_BACKOFF = float(os.environ.get('AZURE_RETRY_BACKOFF', 60))
+
+_lock = threading.Lock()
+_clients: Dict = {}
+_owner_pid: Optional[int] = None
+_last_health_check = 0.0
+_last_health_status = False
+_failed_at = 0.0
+
+class AzureUnavailable(Exception):
+    pass
+
+def module_available(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def azure_configured() -> bool:
+    return bool(
+        os.environ.get('COSMOS_ENDPOINT')
+        and os.environ.get('COSMOS_KEY')
+        and os.environ.get('STORAGE_CONNECTION_STRING')
+    )
+
+def reset_clients():
+    global _owner_pid, _last_health_check, _last_health_status, _failed_at
+    _clients.clear()
+    _owner_pid = None
+    _failed_at = 0.0
+    _last_health_check = 0.0
+    _last_health_status = False
+
+def _reset_after_fork():
+    # The parent's lock may have been held at fork time, so replace it too.
+    global _lock
+    _lock = threading.Lock()
+    reset_clients()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _create_clients() -> Dict:
+    from azure.cosmos import CosmosClient
+    from azure.storage.blob import BlobServiceClient
+
+    cosmos_client = CosmosClient(os.environ['COSMOS_ENDPOINT'], os.environ['COSMOS_KEY'])
+    database = cosmos_client.get_database_client(COSMOS_DATABASE)
+    return {
+        'cosmos': cosmos_client,
+        'container': database.get_container_client(COSMOS_CONTAINER),
+        'blob_service': BlobServiceClient.from_connection_string(os.environ['STORAGE_CONNECTION_STRING'])
+    }
+
+def _get_client(name: str):
+    global _owner_pid, _failed_at
+    pid = os.getpid()
+    # check_health() may clear the clients from another thread at any point.
+    client = _clients.get(name) if _owner_pid == pid else None
+    if client is not None:
+        return client
+
+    # After a failed connect, callers fall back to local storage until the
+    # backoff expires, and then only one thread retries while others move on.
+    if _failed_at and time.monotonic() - _failed_at < RETRY_BACKOFF:
+        raise AzureUnavailable('Azure connection backing off after failure')
+    if not _lock.acquire(blocking=not _failed_at):
+        raise AzureUnavailable('Azure connection retry in progress')
+    try:
+        # Clients built in another process (e.g. a --preload master) hold
+        # sockets that must not be shared, so rebuild them per process.
+        if _owner_pid != pid:
+            _clients.clear()
+        if not _clients:
+            try:
+                _clients.update(_create_clients())
+            except Exception as e:
+                print(f"Azure connection failed: {e}")
+                _failed_at = time.monotonic()
+                raise AzureUnavailable(str(e)) from e
+            _owner_pid = pid
+            _failed_at = 0.0
+        return _clients[name]
+    finally:
+        _lock.release()
+
+def get_container():
+    return _get_client('container')
+
+def get_blob_service_client():
+    return _get_client('blob_service')
+
+def azure_ready() -> bool:
+    try:
+        get_container()
+        return True
+    except AzureUnavailable:
+        return False
+
+def clients_initialized() -> bool:
+    return _owner_pid == os.getpid() and bool(_clients)
+
+def check_health(force: bool = False) -> bool:
+    global _last_health_check, _last_health_status
+    now = time.monotonic()
+    if not force and _last_health_check and now - _last_health_check < HEALTH_CHECK_TTL:
+        return _last_health_status
+
+    try:
+        get_container().read()
+        healthy = True
+    except Exception as e:
+        print(f"Azure health check failed: {e}")
+        with _lock:
+            _clients.clear()
+        healthy = False
+
+    _last_health_check = now
+    _last_health_status = healthy
+    return healthy
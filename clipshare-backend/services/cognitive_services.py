@@ -1,7 +1,5 @@
 import os
 from typing import Dict, Optional
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-import requests
 import time
 
 COGNITIVE_SERVICES_KEY = os.environ.get('COGNITIVE_SERVICES_KEY')
@@ -10,12 +8,24 @@ VIDEO_INDEXER_KEY = os.environ.get('VIDEO_INDEXER_KEY')
 VIDEO_INDEXER_ACCOUNT_ID = os.environ.get('VIDEO_INDEXER_ACCOUNT_ID')
 VIDEO_INDEXER_LOCATION = os.environ.get('VIDEO_INDEXER_LOCATION', 'trial')
 
+_vision_client = None
+_vision_client_pid = None
+
+def _get_vision_client():
+    # Imported and built on first use, once per worker process.
+    global _vision_client, _vision_client_pid
+    if _vision_client is None or _vision_client_pid != os.getpid():
+        from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+        _vision_client = ComputerVisionClient(COGNITIVE_SERVICES_ENDPOINT, COGNITIVE_SERVICES_KEY)
+        _vision_client_pid = os.getpid()
+    return _vision_client
+
 def analyze_video_thumbnail(video_url: str) -> Optional[Dict]:
     if not COGNITIVE_SERVICES_KEY or not COGNITIVE_SERVICES_ENDPOINT:
         return None
     
     try:
-        client = ComputerVisionClient(COGNITIVE_SERVICES_ENDPOINT, COGNITIVE_SERVICES_KEY)
+        client = _get_vision_client()
         analysis = client.analyze_image(video_url, visual_features=['Tags', 'Description', 'Adult', 'Objects'])
         
         return {
@@ -34,6 +44,8 @@ def transcribe_video(video_url: str, video_id: str) -> Optional[Dict]:
         return None
     
     try:
+        import requests
+
         access_token_url = f"https://api.videoindexer.ai/auth/{VIDEO_INDEXER_LOCATION}/Accounts/{VIDEO_INDEXER_ACCOUNT_ID}/AccessToken"
         headers = {'Ocp-Apim-Subscription-Key': VIDEO_INDEXER_KEY}
         response = requests.get(access_token_url, headers=headers, params={'allowEdit': 'true'})
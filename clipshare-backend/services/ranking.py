@@ -0,0 +1,283 @@
+import os
+import re
+import math
+import time
+import bisect
+import heapq
+import threading
+from datetime import datetime, timezone
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 24))
+FEED_SYNC_SECONDS = float(os.environ.get('FEED_SYNC_SECONDS', 60))
+RELATED_PRECOMPUTE = int(os.environ.get('RELATED_PRECOMPUTE', 50))
+RELATED_MAX_POSTINGS = int(os.environ.get('RELATED_MAX_POSTINGS', 100))
+FEED_STARTUP_WAIT = float(os.environ.get('FEED_STARTUP_WAIT', 5))
+
+VIEW_WEIGHT = 1.0
+LIKE_WEIGHT = 5.0
+UPLOAD_WEIGHT = 10.0
+TAG_WEIGHT = 2.0
+
+_TOKEN_RE = re.compile(r'[a-z0-9]{3,}')
+# Decay is applied in log space relative to a fixed epoch, so a score only
+# changes when its own video gets an event and the ordering never goes stale.
+_DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+_EPOCH = 1700000000.0
+
+def _log_add(a: float, b: float) -> float:
+    if a == -math.inf:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+def _event_score(weight: float, at: float) -> float:
+    return math.log(weight) + (at - _EPOCH) * _DECAY_RATE
+
+def _parse_timestamp(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return time.time()
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _format_timestamp(at: float) -> str:
+    return datetime.fromtimestamp(at, timezone.utc).replace(tzinfo=None).isoformat()
+
+def trend_log_score(video: Dict) -> float:
+    score = video.get('trendScore')
+    updated = video.get('trendScoreUpdatedAt')
+    if score is not None and updated:
+        if score <= 0:
+            return -math.inf
+        return math.log(score) + (_parse_timestamp(updated) - _EPOCH) * _DECAY_RATE
+    # Documents written before scores were stored: treat the lifetime
+    # counters as if they arrived at upload time.
+    views = video.get('views', 0) or 0
+    likes = video.get('likes', 0) or 0
+    weight = UPLOAD_WEIGHT + VIEW_WEIGHT * views + LIKE_WEIGHT * likes
+    return _event_score(weight, _parse_timestamp(video.get('createdAt')))
+
+def _store_trend_score(video: Dict, log_score: float, at: float):
+    video['trendScore'] = math.exp(log_score - (at - _EPOCH) * _DECAY_RATE)
+    video['trendScoreUpdatedAt'] = _format_timestamp(at)
+
+def stamp_trend_score(video: Dict, now: Optional[float] = None):
+    now = time.time() if now is None else now
+    _store_trend_score(video, trend_log_score(video), now)
+
+def record_trend_event(video: Dict, weight: float, now: Optional[float] = None):
+    now = time.time() if now is None else now
+    _store_trend_score(video, _log_add(trend_log_score(video), _event_score(weight, now)), now)
+
+def video_terms(video: Dict) -> Dict[str, float]:
+    terms = defaultdict(float)
+    for tag in video.get('tags') or []:
+        terms[f"tag:{str(tag).lower()}"] += TAG_WEIGHT
+    text = f"{video.get('title', '')} {video.get('description', '')}".lower()
+    for token in _TOKEN_RE.findall(text):
+        terms[token] += 1.0
+    return dict(terms)
+
+def _tfidf_vector(terms: Dict[str, float], document_frequency: Dict[str, int], total: int) -> Dict[str, float]:
+    vector = {
+        term: tf * math.log((1 + total) / (1 + document_frequency.get(term, 0)))
+        for term, tf in terms.items()
+    }
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    if not norm:
+        return {}
+    return {term: w / norm for term, w in vector.items() if w}
+
+def _rank_similar(video_id: str, vector: Dict[str, float], postings: Dict[str, List[tuple]]) -> List[tuple]:
+    similarity = defaultdict(float)
+    for term, w in vector.items():
+        for other_id, other_w in postings.get(term, ()):
+            if other_id != video_id:
+                similarity[other_id] += w * other_w
+    return heapq.nsmallest(RELATED_PRECOMPUTE, similarity.items(), key=lambda item: (-item[1], item[0]))
+
+def build_related(terms_by_video: Dict[str, Dict[str, float]]) -> Dict:
+    document_frequency = defaultdict(int)
+    for terms in terms_by_video.values():
+        for term in terms:
+            document_frequency[term] += 1
+
+    total = len(terms_by_video)
+    vectors = {}
+    postings = defaultdict(list)
+    for video_id, terms in terms_by_video.items():
+        vector = _tfidf_vector(terms, document_frequency, total)
+        vectors[video_id] = vector
+        for term, w in vector.items():
+            postings[term].append((video_id, w))
+
+    # Keep only the strongest entries for each term so very common terms
+    # don't make the rebuild quadratic in the catalog size.
+    for term, entries in postings.items():
+        if len(entries) > RELATED_MAX_POSTINGS:
+            postings[term] = heapq.nlargest(RELATED_MAX_POSTINGS, entries, key=lambda entry: entry[1])
+
+    return {
+        'related': {video_id: _rank_similar(video_id, vector, postings) for video_id, vector in vectors.items()},
+        'document_frequency': dict(document_frequency),
+        'postings': dict(postings),
+        'total': total
+    }
+
+class FeedIndex:
+    def __init__(self, sync_interval: float = FEED_SYNC_SECONDS):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        # Serializes load + sync so stale snapshots are never applied out of order.
+        self._sync_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker_pid: Optional[int] = None
+        self._ready = threading.Event()
+        self._videos: Dict[str, Dict] = {}
+        self._touched: Dict[str, float] = {}
+        self._scores: Dict[str, float] = {}
+        self._order: List[tuple] = []
+        self._terms: Dict[str, Dict[str, float]] = {}
+        self._terms_version = 0
+        self._related_index = build_related({})
+        self._related_version = 0
+
+    def _set_score(self, video_id: str, score: float):
+        old = self._scores.get(video_id)
+        if old is not None:
+            index = bisect.bisect_left(self._order, (-old, video_id))
+            if index < len(self._order) and self._order[index] == (-old, video_id):
+                del self._order[index]
+        self._scores[video_id] = score
+        bisect.insort(self._order, (-score, video_id))
+
+    def _remove(self, video_id: str):
+        old = self._scores.pop(video_id, None)
+        if old is not None:
+            index = bisect.bisect_left(self._order, (-old, video_id))
+            if index < len(self._order) and self._order[index] == (-old, video_id):
+                del self._order[index]
+        self._videos.pop(video_id, None)
+        self._touched.pop(video_id, None)
+        self._terms.pop(video_id, None)
+        self._terms_version += 1
+
+    def _apply(self, video: Dict):
+        video_id = video['id']
+        score = trend_log_score(video)
+        current = self._scores.get(video_id)
+        # Stored scores only grow, so a lower one comes from an older snapshot.
+        if current is not None and score < current:
+            return
+        if score != current:
+            self._set_score(video_id, score)
+
+        self._videos[video_id] = video
+        terms = video_terms(video)
+        if terms != self._terms.get(video_id):
+            self._terms[video_id] = terms
+            self._terms_version += 1
+
+    def update(self, video: Dict):
+        with self._lock:
+            self._apply(video)
+            self._touched[video['id']] = time.monotonic()
+
+    def sync(self, videos: List[Dict], loaded_at: Optional[float] = None):
+        loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        with self._lock:
+            seen = set()
+            for video in videos:
+                seen.add(video['id'])
+                self._apply(video)
+            for video_id in list(self._scores):
+                # Keep videos added locally after the snapshot was loaded.
+                if video_id not in seen and self._touched.get(video_id, 0.0) < loaded_at:
+                    self._remove(video_id)
+
+    def refresh(self, loader: Callable[[], List[Dict]]):
+        with self._sync_lock:
+            loaded_at = time.monotonic()
+            self.sync(loader(), loaded_at=loaded_at)
+        self._ready.set()
+        self.refresh_related()
+
+    def _run(self, loader: Callable[[], List[Dict]]):
+        while True:
+            try:
+                self.refresh(loader)
+            except Exception as e:
+                print(f"Feed index refresh failed: {e}")
+                self._ready.set()
+            time.sleep(self.sync_interval)
+
+    def start(self, loader: Callable[[], List[Dict]], wait: float = FEED_STARTUP_WAIT):
+        """Run catalog loads and related rebuilds on a background thread.
+
+        Threads don't survive fork, so this starts one per worker process on
+        first use. Only the first requests wait, for at most `wait` seconds.
+        """
+        if self._worker_pid != os.getpid():
+            with self._start_lock:
+                if self._worker_pid != os.getpid():
+                    self._ready = threading.Event()
+                    threading.Thread(target=self._run, args=(loader,), name='feed-index', daemon=True).start()
+                    self._worker_pid = os.getpid()
+        self._ready.wait(wait)
+
+    def refresh_related(self):
+        with self._lock:
+            if self._related_version == self._terms_version:
+                return
+            version = self._terms_version
+            terms_by_video = dict(self._terms)
+
+        related_index = build_related(terms_by_video)
+
+        with self._lock:
+            if version > self._related_version:
+                self._related_index = related_index
+                self._related_version = version
+
+    def trending(self, limit: int = 20, now: Optional[float] = None) -> List[Dict]:
+        now = time.time() if now is None else now
+        offset = (now - _EPOCH) * _DECAY_RATE
+        with self._lock:
+            results = []
+            for neg_score, video_id in self._order[:max(limit, 0)]:
+                video = dict(self._videos[video_id])
+                video['trendingScore'] = round(math.exp(-neg_score - offset), 4)
+                results.append(video)
+            return results
+
+    def related(self, video_id: str, limit: int = 10) -> Optional[List[Dict]]:
+        with self._lock:
+            if video_id not in self._videos:
+                return None
+            related_index = self._related_index
+            ranked = related_index['related'].get(video_id)
+            terms = self._terms.get(video_id, {})
+
+        if ranked is None:
+            # Added since the last rebuild: score just this video against it.
+            vector = _tfidf_vector(terms, related_index['document_frequency'], related_index['total'])
+            ranked = _rank_similar(video_id, vector, related_index['postings'])
+
+        with self._lock:
+            results = []
+            for other_id, similarity in ranked:
+                if len(results) >= limit:
+                    break
+                other = self._videos.get(other_id)
+                if other is None:
+                    continue
+                video = dict(other)
+                video['similarity'] = round(similarity, 4)
+                results.append(video)
+            return results
@@ -0,0 +1,183 @@
+import os
+import math
+import time
+import sqlite3
+import functools
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), 'clipshare-ratelimit')
+BUCKET_EXPIRY_SECONDS = 3600
+CLEANUP_INTERVAL_SECONDS = 300
+QUEUE_POLL_SECONDS = 0.05
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class AdmissionRejected(Exception):
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"Server busy ({pool}), retry after {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """Token buckets and concurrency pools shared by every worker on a host.
+
+    Buckets live in a SQLite file and pool slots are flock()ed files, so a
+    slot held by a worker that dies is released by the kernel. The state
+    directory is created on first use.
+    """
+
+    def __init__(self, state_dir: str = DEFAULT_STATE_DIR, enabled: bool = True):
+        self.state_dir = state_dir
+        self.enabled = enabled
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross fork or thread boundaries. A connection
+        # to a database that was deleted (e.g. by a tmp cleaner) would keep
+        # working on its own, no longer shared with other workers.
+        path = os.path.join(self.state_dir, 'buckets.db')
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            if self._local.path == path and os.path.exists(path):
+                return conn
+            conn.close()
+        os.makedirs(self.state_dir, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.path = path
+        return conn
+
+    def consume(self, key: str, capacity: float, refill_per_second: float, cost: float = 1.0):
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * refill_per_second)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                conn.execute(
+                    'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                    (key, tokens, now)
+                )
+                if now - self._last_cleanup > CLEANUP_INTERVAL_SECONDS:
+                    conn.execute('DELETE FROM buckets WHERE updated < ?', (now - BUCKET_EXPIRY_SECONDS,))
+                    self._last_cleanup = now
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except (sqlite3.Error, OSError) as e:
+            # Fail open: a broken limiter store should not take the API down.
+            print(f"Rate limiter store error: {e}")
+            return
+
+        if not allowed:
+            retry_after = math.ceil((cost - tokens) / refill_per_second) if refill_per_second > 0 else 60
+            raise RateLimitExceeded(max(1, retry_after))
+
+    def _open_lock_file(self, path: str) -> int:
+        try:
+            return os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        except FileNotFoundError:
+            os.makedirs(self.state_dir, exist_ok=True)
+            return os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+
+    def _try_acquire(self, pool: str, kind: str, size: int) -> Optional[int]:
+        for index in range(size):
+            fd = self._open_lock_file(os.path.join(self.state_dir, f"{pool}.{kind}.{index}.lock"))
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+            except OSError:
+                os.close(fd)
+                raise
+        return None
+
+    def _release(self, fd: int):
+        # Closing the descriptor drops the flock even if the unlock fails.
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        except OSError:
+            pass
+        os.close(fd)
+
+    def _acquire_slot(self, pool: str, max_concurrent: int, max_queue: int, max_wait: float) -> int:
+        retry_after = max(1, math.ceil(max_wait))
+        slot = self._try_acquire(pool, 'slot', max_concurrent)
+        if slot is None:
+            ticket = self._try_acquire(pool, 'queue', max_queue)
+            if ticket is None:
+                raise AdmissionRejected(pool, retry_after)
+            try:
+                deadline = time.monotonic() + max_wait
+                while slot is None and time.monotonic() < deadline:
+                    time.sleep(QUEUE_POLL_SECONDS)
+                    slot = self._try_acquire(pool, 'slot', max_concurrent)
+            finally:
+                self._release(ticket)
+            if slot is None:
+                raise AdmissionRejected(pool, retry_after)
+        return slot
+
+    @contextmanager
+    def admit(self, pool: str, max_concurrent: int, max_queue: int, max_wait: float):
+        if not self.enabled or not FCNTL_AVAILABLE:
+            yield
+            return
+
+        try:
+            slot = self._acquire_slot(pool, max_concurrent, max_queue, max_wait)
+        except OSError as e:
+            # Fail open, as consume() does for the bucket store.
+            print(f"Rate limiter slot error: {e}")
+            slot = None
+
+        try:
+            yield
+        finally:
+            if slot is not None:
+                self._release(slot)
+
+    def limit(self, route: str, key_func: Callable[[], str], capacity: float, per_seconds: float):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                self.consume(f"{route}:{key_func()}", capacity, capacity / per_seconds)
+                return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def concurrency(self, pool: str, max_concurrent: int, max_queue: int, max_wait: float):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.admit(pool, max_concurrent, max_queue, max_wait):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
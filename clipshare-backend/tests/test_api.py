@@ -5,10 +5,15 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import app as app_module
 from app import app
 
 @pytest.fixture
-def client():
+def client(tmp_path, monkeypatch):
+    # Keep limiter state out of the shared default directory.
+    monkeypatch.setattr(app_module.rate_limiter, 'state_dir', str(tmp_path))
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
@@ -50,3 +55,51 @@ def test_like_video(client):
         assert response.status_code == 200
         data = json.loads(response.data)
         assert 'likes' in data
+
+def test_trending_feed(client):
+    response = client.get('/api/feed/trending?limit=5')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert 'videos' in data
+    assert len(data['videos']) <= 5
+
+def test_related_videos_not_found(client):
+    response = client.get('/api/videos/does-not-exist/related')
+    assert response.status_code == 404
+
+def test_expensive_endpoint_rate_limited(client):
+    statuses = [client.post('/api/videos/does-not-exist/analyze').status_code for _ in range(10)]
+    assert 429 in statuses
+    response = client.post('/api/videos/does-not-exist/analyze')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+def test_feed_limit_validation(client):
+    assert client.get('/api/feed/trending?limit=abc').status_code == 400
+    response = client.get('/api/feed/trending?limit=-1')
+    assert response.status_code == 200
+    assert len(json.loads(response.data)['videos']) <= 1
+
+def test_forwarded_for_ignored_without_trusted_proxy(client):
+    statuses = [
+        client.post(
+            '/api/videos/does-not-exist/analyze',
+            headers={'X-Forwarded-For': f'spoofed-{i}'}
+        ).status_code
+        for i in range(10)
+    ]
+    assert 429 in statuses
+
+def test_spoofed_forwarded_for_does_not_reset_bucket(client, monkeypatch):
+    monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app, x_for=1, x_proto=0))
+    # Requests arrive via different proxy instances; the real client address
+    # is the entry the trusted proxy appended last.
+    statuses = [
+        client.post(
+            '/api/videos/does-not-exist/analyze',
+            headers={'X-Forwarded-For': f'spoofed-{i}, 203.0.113.7'},
+            environ_base={'REMOTE_ADDR': f'10.0.0.{i}'}
+        ).status_code
+        for i in range(10)
+    ]
+    assert 429 in statuses
@@ -0,0 +1,101 @@
+import os
+import sys
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from services import azure_clients
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SDK_MODULES = [
+    'azure.cosmos',
+    'azure.storage.blob',
+    'azure.cognitiveservices.vision.computervision'
+]
+
+class FakeContainer:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+
+    def read(self):
+        if not self.healthy:
+            raise ConnectionError('endpoint unreachable')
+        return {}
+
+@pytest.fixture(autouse=True)
+def fake_clients(monkeypatch):
+    created = []
+
+    def create():
+        clients = {'cosmos': object(), 'container': FakeContainer(), 'blob_service': object()}
+        created.append(clients)
+        return clients
+
+    monkeypatch.setattr(azure_clients, '_create_clients', create)
+    azure_clients.reset_clients()
+    yield created
+    azure_clients.reset_clients()
+
+def test_app_import_does_not_load_sdks(tmp_path):
+    # Importable stand-ins for the SDKs; importing any of them is recorded.
+    for module in SDK_MODULES:
+        package_dir = tmp_path.joinpath(*module.split('.'))
+        package_dir.mkdir(parents=True, exist_ok=True)
+        for parent in package_dir.relative_to(tmp_path).parents:
+            init = tmp_path / parent / '__init__.py'
+            if parent != parent.parent and not init.exists():
+                init.write_text('')
+        (package_dir / '__init__.py').write_text('raise ImportError("SDK imported at app import time")\n')
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([str(tmp_path), BACKEND_DIR]),
+        COSMOS_ENDPOINT='https://example.documents.azure.com',
+        COSMOS_KEY='key',
+        STORAGE_CONNECTION_STRING='conn',
+        RATE_LIMIT_DIR=str(tmp_path / 'ratelimit')
+    )
+    script = (
+        "import sys, app\n"
+        f"print(app.AZURE_AVAILABLE, app.USE_AZURE, any(m in sys.modules for m in {SDK_MODULES!r}))\n"
+    )
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env)
+    assert output.decode().split() == ['True', 'True', 'False']
+
+def test_clients_created_lazily_once(fake_clients):
+    assert not azure_clients.clients_initialized()
+    first = azure_clients.get_container()
+    assert azure_clients.get_container() is first
+    assert azure_clients.get_blob_service_client() is fake_clients[0]['blob_service']
+    assert len(fake_clients) == 1
+
+def test_clients_rebuilt_in_new_process(fake_clients, monkeypatch):
+    first = azure_clients.get_container()
+    monkeypatch.setattr(azure_clients.os, 'getpid', lambda: -1)
+    assert azure_clients.get_container() is not first
+    assert len(fake_clients) == 2
+
+def test_failed_health_check_rebuilds_clients(fake_clients):
+    azure_clients.get_container().healthy = False
+    assert azure_clients.check_health(force=True) is False
+
+    assert azure_clients.get_container() is fake_clients[1]['container']
+    assert azure_clients.check_health(force=True) is True
+
+def test_failed_connect_backs_off(monkeypatch):
+    attempts = []
+
+    def failing_create():
+        attempts.append(1)
+        raise ConnectionError('bad endpoint')
+
+    monkeypatch.setattr(azure_clients, '_create_clients', failing_create)
+    assert azure_clients.azure_ready() is False
+    assert azure_clients.azure_ready() is False
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(azure_clients, 'RETRY_BACKOFF', 0)
+    assert azure_clients.azure_ready() is False
+    assert len(attempts) == 2
@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ranking import FeedIndex, record_trend_event, stamp_trend_score, trend_log_score, VIEW_WEIGHT, LIKE_WEIGHT
+
+NOW = 1760000000.0
+
+def make_video(video_id, created='2025-10-09T08:00:00', views=0, likes=0, title='', tags=None):
+    return {
+        'id': video_id,
+        'title': title,
+        'description': '',
+        'createdAt': created,
+        'views': views,
+        'likes': likes,
+        'tags': tags or []
+    }
+
+def synced_index(videos):
+    index = FeedIndex()
+    index.sync(videos)
+    index.refresh_related()
+    return index
+
+def test_trending_orders_by_activity():
+    a, b = make_video('a', views=1), make_video('b', views=50)
+    index = synced_index([a, b])
+    assert [v['id'] for v in index.trending(now=NOW)] == ['b', 'a']
+
+    for _ in range(40):
+        record_trend_event(a, LIKE_WEIGHT, now=NOW)
+    index.update(a)
+    assert [v['id'] for v in index.trending(now=NOW)] == ['a', 'b']
+
+def test_trending_decays_old_activity():
+    index = synced_index([
+        make_video('old', created='2025-09-01T00:00:00', views=100),
+        make_video('new', created='2025-10-09T08:00:00', views=5)
+    ])
+    assert index.trending(limit=1, now=NOW)[0]['id'] == 'new'
+
+def test_stored_score_survives_restart():
+    old = make_video('old', created='2025-09-01T00:00:00')
+    stamp_trend_score(old, now=NOW - 30 * 86400)
+    for _ in range(50):
+        record_trend_event(old, VIEW_WEIGHT, now=NOW)
+    old['views'] = 50
+    new = make_video('new', views=5)
+
+    # A fresh index, as in a new worker, ranks by the stored score rather
+    # than replaying lifetime counters at createdAt.
+    index = synced_index([old, new])
+    assert index.trending(limit=1, now=NOW)[0]['id'] == 'old'
+
+def test_record_trend_event_matches_log_score():
+    video = make_video('a')
+    stamp_trend_score(video, now=NOW)
+    before = trend_log_score(video)
+    record_trend_event(video, VIEW_WEIGHT, now=NOW)
+    assert trend_log_score(video) > before
+    assert video['trendScoreUpdatedAt'].startswith('2025-10-09')
+
+def test_stale_snapshot_is_ignored():
+    video = make_video('a', views=1)
+    stamp_trend_score(video, now=NOW)
+    stale = dict(video)
+    index = synced_index([video])
+
+    fresh = dict(video, views=2)
+    record_trend_event(fresh, VIEW_WEIGHT, now=NOW)
+    index.update(fresh)
+    score = index.trending(now=NOW)[0]['trendingScore']
+
+    index.sync([stale])
+    top = index.trending(now=NOW)[0]
+    assert top['views'] == 2
+    assert top['trendingScore'] == score
+
+def test_sync_removes_deleted_videos():
+    index = synced_index([make_video('a')])
+    index.sync([])
+    assert index.trending(now=NOW) == []
+
+def test_sync_keeps_videos_updated_after_load():
+    index = FeedIndex()
+    loaded_at = time.monotonic()
+    index.update(make_video('new'))
+    index.sync([], loaded_at=loaded_at)
+    assert [v['id'] for v in index.trending(now=NOW)] == ['new']
+
+def test_trending_limit_is_not_negative():
+    index = synced_index([make_video('a'), make_video('b')])
+    assert index.trending(limit=-1, now=NOW) == []
+    assert len(index.trending(limit=1, now=NOW)) == 1
+
+def test_related_uses_shared_tags():
+    index = synced_index([
+        make_video('cat1', title='funny cat', tags=['cat', 'pet']),
+        make_video('cat2', title='sleepy cat', tags=['cat', 'pet']),
+        make_video('car', title='fast car', tags=['car', 'road'])
+    ])
+    related = index.related('cat1')
+    assert [v['id'] for v in related] == ['cat2']
+    assert index.related('missing') is None
+
+def test_related_for_video_added_after_rebuild():
+    index = synced_index([
+        make_video('cat1', title='funny cat', tags=['cat', 'pet']),
+        make_video('car', title='fast car', tags=['car', 'road'])
+    ])
+    index.update(make_video('cat2', title='sleepy cat', tags=['cat', 'pet']))
+    assert [v['id'] for v in index.related('cat2')] == ['cat1']
+
+def test_background_refresh_loads_catalog():
+    index = FeedIndex(sync_interval=3600)
+    index.start(lambda: [make_video('a', title='funny cat'), make_video('b', title='sleepy cat')], wait=5)
+    assert {v['id'] for v in index.trending(now=NOW)} == {'a', 'b'}
@@ -0,0 +1,71 @@
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from services.rate_limiter import RateLimiter, RateLimitExceeded, AdmissionRejected
+
+@pytest.fixture
+def limiter(tmp_path):
+    return RateLimiter(str(tmp_path))
+
+def test_token_bucket_allows_burst_then_rejects(limiter):
+    for _ in range(3):
+        limiter.consume('analyze:client', capacity=3, refill_per_second=0.1)
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.consume('analyze:client', capacity=3, refill_per_second=0.1)
+    assert excinfo.value.retry_after == 10
+
+    limiter.consume('analyze:other-client', capacity=3, refill_per_second=0.1)
+
+def test_buckets_shared_between_instances(tmp_path):
+    first = RateLimiter(str(tmp_path))
+    second = RateLimiter(str(tmp_path))
+    first.consume('upload:client', capacity=1, refill_per_second=0.01)
+    with pytest.raises(RateLimitExceeded):
+        second.consume('upload:client', capacity=1, refill_per_second=0.01)
+
+def test_admission_rejects_when_queue_full(limiter):
+    with limiter.admit('cognitive', max_concurrent=1, max_queue=0, max_wait=1):
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with limiter.admit('cognitive', max_concurrent=1, max_queue=0, max_wait=1):
+                pass
+    assert excinfo.value.retry_after == 1
+
+    with limiter.admit('cognitive', max_concurrent=1, max_queue=0, max_wait=1):
+        pass
+
+def test_admission_times_out_in_queue(limiter):
+    with limiter.admit('upload', max_concurrent=1, max_queue=1, max_wait=0.1):
+        with pytest.raises(AdmissionRejected):
+            with limiter.admit('upload', max_concurrent=1, max_queue=1, max_wait=0.1):
+                pass
+
+def test_disabled_limiter_allows_everything(tmp_path):
+    limiter = RateLimiter(str(tmp_path), enabled=False)
+    for _ in range(5):
+        limiter.consume('upload:client', capacity=1, refill_per_second=0.01)
+
+def test_state_dir_recreated_after_removal(tmp_path):
+    state_dir = tmp_path / 'state'
+    limiter = RateLimiter(str(state_dir))
+    limiter.consume('upload:client', capacity=1, refill_per_second=0.01)
+    shutil.rmtree(state_dir)
+
+    with limiter.admit('upload', max_concurrent=1, max_queue=0, max_wait=1):
+        with pytest.raises(AdmissionRejected):
+            with limiter.admit('upload', max_concurrent=1, max_queue=0, max_wait=1):
+                pass
+    limiter.consume('upload:client', capacity=1, refill_per_second=0.01)
+    assert (state_dir / 'buckets.db').exists()
+
+def test_admission_fails_open_on_os_error(limiter, monkeypatch):
+    def broken_open(*args, **kwargs):
+        raise PermissionError('read-only file system')
+
+    monkeypatch.setattr(os, 'open', broken_open)
+    with limiter.admit('cognitive', max_concurrent=1, max_queue=0, max_wait=1):
+        pass
@@ -178,6 +178,7 @@ az webapp config appsettings set \
     COSMOS_ENDPOINT="$COSMOS_ENDPOINT" \
     COSMOS_KEY="$COSMOS_KEY" \
     STORAGE_CONNECTION_STRING="$STORAGE_CONNECTION_STRING" \
+    TRUSTED_PROXY_COUNT=1 \
     PORT=80 \
     FLASK_APP=app.py
 